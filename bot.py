@@ -1,25 +1,55 @@
+from __future__ import annotations
+
+import asyncio
+import functools
 import logging
 import os
 import re
 import sqlite3
+import string
 import sys
-from typing import Dict, List, Optional, Set, Tuple
-
-import discord
-from discord import app_commands
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, Hashable, Iterable, List, Literal, Optional, Protocol, Set, Tuple, Union
+
+if TYPE_CHECKING:
+    import discord
+    from discord import app_commands
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
 
 DB_PATH = os.getenv("KEYWORD_BOT_DB", "data/keywords.db")
 LOG_PATH = os.getenv("KEYWORD_BOT_LOG_PATH", "bot.log")
 LOG_LEVEL = os.getenv("KEYWORD_BOT_LOG_LEVEL", "INFO").upper()
 GUILD_IDS_RAW = os.getenv("KEYWORD_BOT_GUILD_IDS", "")
-
-INTENTS = discord.Intents.default()
-INTENTS.message_content = True
-INTENTS.guilds = True
-INTENTS.members = True
-
-bot = discord.Client(intents=INTENTS)
-tree = app_commands.CommandTree(bot)
+_GUILD_ID_ENTRIES = [gid.strip() for gid in GUILD_IDS_RAW.split(",") if gid.strip()]
+GUILD_IDS: List[int] = [int(gid) for gid in _GUILD_ID_ENTRIES if gid.isdecimal()]
+KEYWORD_LIMIT = 10
+PREVIEW_LIMIT = 200
+NOTIFY_QUEUE_SIZE = 1024
+NOTIFY_WORKERS = 4
+NOTIFY_CONCURRENCY = 10
+LOOKUP_CACHE_SIZE = 20000
+LOOKUP_CACHE_TTL = 600
+PERMISSION_CACHE_TTL = 30
+
+# Created by _build_bot() so that importing this module does not load discord.py.
+bot: discord.Client
+tree: app_commands.CommandTree
 
 logger = logging.getLogger("keyword_bot")
 
@@ -91,12 +121,115 @@ KOREAN_PARTICLES: Tuple[str, ...] = (
     "께",
 )
 
-_KOREAN_PARTICLE_PATTERN = "|".join(
-    sorted((re.escape(p) for p in KOREAN_PARTICLES), key=len, reverse=True)
+# Particles are plain Hangul with no regex metacharacters, so they need no escaping.
+_KOREAN_PARTICLE_PATTERN = "|".join(sorted(KOREAN_PARTICLES, key=len, reverse=True))
+_PARTICLE_GROUP = f"(?:{_KOREAN_PARTICLE_PATTERN}){{0,3}}"
+_PARTICLE_TAIL_RE = re.compile(rf"{_PARTICLE_GROUP}(?!\w)")
+_WORD_CHAR_RE = re.compile(r"\w")
+# Lowercase characters that re's IGNORECASE treats as equal to another lowercase
+# character (e.g. "ſ" and "s"), which str.lower() comparisons cannot reproduce.
+_FOLD_VARIANT_RE = re.compile(
+    "[\u00b5\u0131\u017f\u0345\u0390\u03b0\u03b2\u03b5\u03b8\u03b9\u03ba\u03bc\u03c0\u03c1\u03c2\u03c3"
+    "\u03c6\u03d0\u03d1\u03d5\u03d6\u03f0\u03f1\u03f5\u0432\u0434\u043e\u0441\u0442\u044a\u0463\u1c80"
+    "\u1c81\u1c82\u1c83\u1c84\u1c85\u1c86\u1c87\u1c88\u1e61\u1e9b\u1fbe\u1fd3\u1fe3\ua64b\ufb05\ufb06]"
+)
+
+# Characters that IGNORECASE equates with a character of the other word-ness
+# (U+0345 is not \w but folds to iota), so a keyword starting with one cannot
+# take its leading \b from the keyword itself.
+_WORDNESS_VARIANTS = frozenset("\u0345\u0399\u03b9\u1fbe")
+
+AddKeywordResult = Literal["added", "duplicate", "limit"]
+# An int channel id, or "GLOBAL" for server-wide keywords.
+ChannelKey = Union[int, str]
+
+# Statements are reused verbatim so the connection's statement cache keeps them prepared.
+_SQL_INSERT_UNDER_LIMIT = (
+    "INSERT OR IGNORE INTO keywords (user_id, keyword, channel_id, guild_id) SELECT ?, ?, ?, ? "
+    "WHERE (SELECT COUNT(*) FROM keywords WHERE user_id = ? AND guild_id = ?) < ?"
+)
+_SQL_LIST_KEYWORDS = (
+    "SELECT keyword, channel_id FROM keywords WHERE user_id = ? AND guild_id = ? ORDER BY keyword, channel_id"
 )
+_SQL_DELETE_KEYWORD = "DELETE FROM keywords WHERE user_id = ? AND guild_id = ? AND keyword = ?"
+_SQL_ALL_KEYWORDS = "SELECT guild_id, user_id, keyword, channel_id FROM keywords"
+
+_CONN: Optional[sqlite3.Connection] = None
+# Reentrant so that _get_conn() can open the database while a helper holds it.
+_CONN_LOCK = threading.RLock()
+
+# guild_id -> channel key -> [(user_id, keyword)], loaded once by
+# load_keyword_index() and kept in step with every write so messages never hit
+# SQLite. Only the event loop mutates it.
+_GUILD_KEYWORDS: Dict[int, Dict[ChannelKey, List[Tuple[int, str]]]] = {}
+# guild_id -> channel key -> matcher, rebuilt off the event loop after every
+# change to the guild's rows and swapped in whole, so on_message only looks up.
+_GUILD_MATCHERS: Dict[int, Dict[ChannelKey, "KeywordMatcher"]] = {}
+
+# Created by setup_hook() on the bot's event loop; before Python 3.10 asyncio
+# primitives bind to the loop that is current when they are constructed.
+# Serializes keyword writes so the index is updated in the same order as the table.
+_GUILD_LOCK: asyncio.Lock
+# Caps concurrent member/user lookups and DM sends to stay clear of rate limits.
+_NOTIFY_SEMAPHORE: asyncio.Semaphore
+# Matched messages wait here so on_message returns as soon as the scan is done.
+_NOTIFY_QUEUE: asyncio.Queue
+_NOTIFY_TASKS: List[asyncio.Task] = []
+
+_MISSING = object()
+_SYNCED = False
+
+# SQLite's NOCASE collation only folds ASCII letters.
+_NOCASE_TABLE = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+class _TTLCache:
+    """LRU mapping whose entries expire ttl seconds after they are stored."""
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._data: OrderedDict[Hashable, Tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = self._data.get(key)
+        if item is None:
+            return default
+        if item[0] < time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return item[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = (time.monotonic() + self._ttl, value)
+        self._data.move_to_end(key)
+        if len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+
+# REST lookups for members and users missing from discord.py's caches, including
+# members that were not found, keyed by (guild_id, user_id) and user_id.
+_MEMBER_CACHE = _TTLCache(LOOKUP_CACHE_SIZE, LOOKUP_CACHE_TTL)
+_USER_CACHE = _TTLCache(LOOKUP_CACHE_SIZE, LOOKUP_CACHE_TTL)
+
+# guild_id -> [(channel_id, lowercased name, choice)] in channel position order,
+# rebuilt after any channel is created, updated or deleted.
+_CHANNEL_CHOICES: Dict[int, List[Tuple[int, str, app_commands.Choice[str]]]] = {}
+# guild_id -> stored channel_id text -> "#name", derived from the same choices.
+_CHANNEL_LABELS: Dict[int, Dict[str, str]] = {}
+# (guild_id, user_id, channel_id) -> view_channel, for autocomplete only; the
+# add command re-checks the permission itself.
+_VIEW_CACHE = _TTLCache(LOOKUP_CACHE_SIZE, PERMISSION_CACHE_TTL)
 
 
 def setup_logging() -> None:
+    # basicConfig() ignores repeat calls; return before opening another log file.
+    if logging.getLogger().handlers:
+        return
     handlers: List[logging.Handler] = [logging.StreamHandler(sys.stdout)]
     try:
         handlers.append(logging.FileHandler(LOG_PATH))
@@ -110,185 +243,630 @@ def setup_logging() -> None:
     )
 
 
-def _preview_message(text: str, limit: int = 200) -> str:
-    if len(text) <= limit:
-        return text
-    return text[: limit - 3] + "..."
+def _channel_key(channel_id: str) -> ChannelKey:
+    # channel_id is stored as TEXT; the index keys it like message.channel.id.
+    return channel_id if channel_id == "GLOBAL" else int(channel_id)
+
+
+def _preview_message(text: str, limit: int = PREVIEW_LIMIT) -> str:
+    return text if len(text) <= limit else f"{text[: limit - 3]}..."
+
+
+def _has_hangul(text: str) -> bool:
+    return any("\uac00" <= char <= "\ud7a3" for char in text)
 
 
+def _is_cased(keyword: str) -> bool:
+    return keyword.lower() != keyword.upper()
+
+
+@functools.lru_cache(maxsize=2048)
 def _compile_keyword_pattern(keyword: str) -> re.Pattern:
     escaped = re.escape(keyword)
-    if re.search(r"[가-힣]", keyword):
+    # Hangul has no case, so case folding is only paid for keywords that need it.
+    flags = re.IGNORECASE if _is_cased(keyword) else 0
+    if _has_hangul(keyword):
         # Allow up to 3 stacked particles while keeping strict word boundaries.
-        return re.compile(
-            rf"(?<!\w){escaped}(?:{_KOREAN_PARTICLE_PATTERN}){{0,3}}(?!\w)",
-            re.IGNORECASE,
-        )
-    return re.compile(rf"\b{escaped}\b", re.IGNORECASE)
+        return re.compile(rf"(?<!\w){escaped}{_PARTICLE_GROUP}(?!\w)", flags)
+    return re.compile(rf"\b{escaped}\b", flags)
 
 
-def init_db() -> None:
-    db_dir = os.path.dirname(DB_PATH)
-    if db_dir:
-        os.makedirs(db_dir, exist_ok=True)
-    conn = sqlite3.connect(DB_PATH, timeout=10)
-    try:
-        conn.execute(
-            """
-            CREATE TABLE IF NOT EXISTS keywords (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER NOT NULL,
-                keyword TEXT NOT NULL COLLATE NOCASE,
-                channel_id TEXT NOT NULL,
-                guild_id INTEGER NOT NULL,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-            """
-        )
-        conn.execute(
-            """
-            CREATE UNIQUE INDEX IF NOT EXISTS idx_keywords_unique
-            ON keywords (user_id, keyword, channel_id, guild_id)
-            """
+def _keyword_union_part(keyword: str) -> Tuple[Optional[bool], str]:
+    # Split a keyword pattern into its leading boundary (True for "not after a word
+    # character", None when it depends on the matched text) and the rest, so
+    # alternations can share the leading lookbehind.
+    escaped = re.escape(keyword)
+    if _has_hangul(keyword):
+        leading_non_word, body = True, rf"{escaped}{_PARTICLE_GROUP}(?!\w)"
+    elif keyword[0] in _WORDNESS_VARIANTS:
+        leading_non_word, body = None, rf"\b{escaped}\b"
+    else:
+        leading_non_word, body = _WORD_CHAR_RE.match(keyword) is not None, rf"{escaped}\b"
+    if _is_cased(keyword):
+        body = f"(?i:{body})"
+    return leading_non_word, body
+
+
+def _build_union(
+    parts: List[Tuple[int, Optional[bool], str]], flags: int
+) -> Tuple[Optional[re.Pattern], List[int]]:
+    after_non_word = [(index, body) for index, leading_non_word, body in parts if leading_non_word is True]
+    after_word = [(index, body) for index, leading_non_word, body in parts if leading_non_word is False]
+    anywhere = [(index, body) for index, leading_non_word, body in parts if leading_non_word is None]
+    branches: List[str] = []
+    if after_non_word:
+        branches.append(r"(?<!\w)(?:" + "|".join(f"({body})" for _, body in after_non_word) + ")")
+    if after_word:
+        branches.append(r"(?<=\w)(?:" + "|".join(f"({body})" for _, body in after_word) + ")")
+    if anywhere:
+        branches.append("|".join(f"({body})" for _, body in anywhere))
+    if not branches:
+        return None, []
+    # Capturing groups are numbered in order of appearance in the union.
+    group_index = [index for index, _ in after_non_word + after_word + anywhere]
+    return re.compile("|".join(branches), flags), group_index
+
+
+def _lowers_like_re(keyword: str, lowered: str) -> bool:
+    # Comparing lower() output only agrees with re's IGNORECASE matching while
+    # lowering keeps offsets and no character has an extra case equivalent.
+    return len(lowered) == len(keyword) and not _FOLD_VARIANT_RE.search(lowered)
+
+
+class _Prefilter(Protocol):
+    def search(self, text: str) -> object: ...
+
+
+class _HyperscanPrefilter:
+    """Literal multi-pattern scan with the same search() contract as an RE2 pattern."""
+
+    def __init__(self, literals: List[str]) -> None:
+        self._db = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+        self._db.compile(
+            expressions=[literal.encode("utf-8") for literal in literals],
+            ids=list(range(len(literals))),
+            elements=len(literals),
+            flags=0,
+            literal=True,
         )
-        conn.execute(
-            """
-            CREATE INDEX IF NOT EXISTS idx_keywords_guild
-            ON keywords (guild_id)
-            """
+
+    def search(self, text: str) -> bool:
+        try:
+            self._db.scan(text.encode("utf-8"), match_event_handler=_stop_scan)
+        except hyperscan.ScanTerminated:
+            return True
+        return False
+
+
+def _stop_scan(pattern_id: int, start: int, end: int, flags: int, context: object) -> bool:
+    # Returning True stops the scan at the first hit.
+    return True
+
+
+class _AutomatonPrefilter:
+    """Aho-Corasick presence test over the literals."""
+
+    def __init__(self, literals: List[str]) -> None:
+        self._automaton = ahocorasick.Automaton()
+        for literal in literals:
+            self._automaton.add_word(literal, None)
+        self._automaton.make_automaton()
+
+    def search(self, text: str) -> bool:
+        return next(self._automaton.iter(text), None) is not None
+
+
+class _FirstCharPrefilter:
+    """Rejects text that contains none of the literals' first characters."""
+
+    def __init__(self, literals: List[str]) -> None:
+        self._first_chars = frozenset(literal[0] for literal in literals)
+
+    def search(self, text: str) -> bool:
+        return not self._first_chars.isdisjoint(text)
+
+
+def _build_prefilter(literals: List[str]) -> _Prefilter:
+    if hyperscan is not None:
+        return _HyperscanPrefilter(literals)
+    if re2 is not None:
+        return re2.compile("|".join(re2.escape(literal) for literal in literals))
+    if ahocorasick is not None:
+        return _AutomatonPrefilter(literals)
+    return _FirstCharPrefilter(literals)
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+def _is_word_boundary(text: str, index: int) -> bool:
+    before = index > 0 and _is_word_char(text[index - 1])
+    after = index < len(text) and _is_word_char(text[index])
+    return before != after
+
+
+class KeywordMatcher:
+    """Finds every keyword tracked in one channel with a single scan per matcher kind."""
+
+    def __init__(self, rows: Iterable[Tuple[int, str]]) -> None:
+        groups: Dict[str, List[Tuple[int, str]]] = {}
+        for user_id, keyword in rows:
+            groups.setdefault(keyword.lower(), []).append((user_id, keyword))
+
+        keys = list(groups)
+        self._owners = [groups[key] for key in keys]
+        self._keys = keys
+
+        # Keywords whose lowercase form compares like re's IGNORECASE are located in
+        # the lowered text, with an Aho-Corasick automaton when pyahocorasick is
+        # installed and str.find otherwise, and only the boundaries around each hit
+        # are checked. Unlike a union regex, which tries every alternative at every
+        # position, this stays fast with thousands of keywords.
+        self._literals = [i for i, key in enumerate(keys) if _lowers_like_re(self._owners[i][0][1], key)]
+        self._literal_set = set(self._literals)
+        self._particle_literals = {i for i in self._literals if _has_hangul(keys[i])}
+        self._cased_literals = [i for i in self._literals if _is_cased(keys[i])]
+        self._uncased_literals = self._literal_set.difference(self._cased_literals)
+        regex_indices = [i for i in range(len(keys)) if i not in self._literal_set]
+        self._automaton = None
+        if ahocorasick is not None and self._literals:
+            automaton = ahocorasick.Automaton()
+            for index in self._literals:
+                automaton.add_word(keys[index], (index, len(keys[index])))
+            automaton.make_automaton()
+            self._automaton = automaton
+
+        # Alternation reports one keyword per start position, so keywords that can
+        # start at the same place as another one are re-checked individually.
+        # casefold() also merges most extra case equivalences re applies ("ſ" and
+        # "s"); dotless i is the one it keeps apart.
+        folded = [key.casefold().replace("ı", "i") for key in keys]
+        self._overlaps = {
+            i: [
+                j
+                for j in regex_indices
+                if j != i and (folded[j].startswith(folded[i]) or folded[i].startswith(folded[j]))
+            ]
+            for i in regex_indices
+        }
+
+        parts = [(index, *_keyword_union_part(self._owners[index][0][1])) for index in regex_indices]
+        self._union, self._group_index = _build_union(parts, 0)
+        # Hangul keywords can never match ASCII-only text, and for such text ASCII
+        # \b and \w behave exactly like their Unicode versions. Case folding only
+        # does too while every keyword is ASCII as written, not just once lowered
+        # (e.g. "ſ" folds to "s" and the Kelvin sign lowers to "k").
+        ascii_parts = [part for part in parts if not _has_hangul(keys[part[0]])]
+        ascii_flags = (
+            re.ASCII if all(self._owners[part[0]][0][1].isascii() for part in ascii_parts) else 0
         )
-        conn.commit()
-    finally:
-        conn.close()
+        self._ascii_union, self._ascii_group_index = _build_union(ascii_parts, ascii_flags)
+
+        # Every match contains its lowercased keyword, so a linear-time scan for the
+        # bare keywords rejects most messages before the boundary-aware patterns run.
+        # hyperscan and RE2 do not support the lookarounds those patterns need, so
+        # they cannot replace them outright. Without any of the optional engines,
+        # a first-character test still skips text that shares no letter with them.
+        self._prefilter: Optional[_Prefilter] = None
+        if keys and all(_lowers_like_re(owners[0][1], key) for key, owners in groups.items()):
+            self._prefilter = _build_prefilter(keys)
+
+    def find(self, content: str, author_id: int) -> Dict[int, Set[str]]:
+        lowered: Optional[str] = None
+        if self._prefilter is not None or self._literals:
+            lowered = content.lower()
+            if not _lowers_like_re(content, lowered):
+                lowered = None
+        if self._prefilter is not None and lowered is not None and not self._prefilter.search(lowered):
+            return {}
+
+        hits: Set[int] = set()
+        if self._literals:
+            self._find_literals(content, lowered, hits)
+        if content.isascii():
+            if self._ascii_union is not None:
+                self._find_union(content, hits, self._ascii_union, self._ascii_group_index)
+        elif self._union is not None:
+            self._find_union(content, hits, self._union, self._group_index)
+
+        matched: Dict[int, Set[str]] = {}
+        log_skips = logger.isEnabledFor(logging.INFO)
+        for index in hits:
+            for user_id, keyword in self._owners[index]:
+                if user_id == author_id:
+                    if log_skips:
+                        logger.info(
+                            "Skip self match: user=%s keyword=%s",
+                            user_id,
+                            keyword,
+                        )
+                    continue
+                matched.setdefault(user_id, set()).add(keyword)
+        return matched
+
+    def _find_literals(self, content: str, lowered: Optional[str], hits: Set[int]) -> None:
+        if lowered is not None:
+            self._scan_literals(content, lowered, hits, self._literal_set)
+            return
+        # Without a usable lowered text, uncased keywords still match the content
+        # as written; only the cased ones need their own patterns.
+        self._scan_literals(content, content, hits, self._uncased_literals)
+        for index in self._cased_literals:
+            if self._pattern(index).search(content):
+                hits.add(index)
+
+    def _scan_literals(self, content: str, text: str, hits: Set[int], wanted: Set[int]) -> None:
+        # text is content itself or its lowered form, with the same offsets.
+        if self._automaton is None:
+            for index in wanted:
+                key = self._keys[index]
+                start = text.find(key)
+                while start != -1:
+                    if self._literal_at(content, index, start, start + len(key)):
+                        hits.add(index)
+                        break
+                    start = text.find(key, start + 1)
+            return
+        for end, (index, length) in self._automaton.iter(text):
+            if index in hits or index not in wanted:
+                continue
+            if self._literal_at(content, index, end - length + 1, end + 1):
+                hits.add(index)
+
+    def _literal_at(self, content: str, index: int, start: int, end: int) -> bool:
+        if index in self._particle_literals:
+            # Same as (?<!\w)keyword(?:particles){0,3}(?!\w) in _compile_keyword_pattern.
+            if start > 0 and _is_word_char(content[start - 1]):
+                return False
+            return _PARTICLE_TAIL_RE.match(content, end) is not None
+        return _is_word_boundary(content, start) and _is_word_boundary(content, end)
+
+    def _pattern(self, index: int) -> re.Pattern:
+        # Compiled on first use, since most keywords never need their own pattern.
+        return _compile_keyword_pattern(self._owners[index][0][1])
+
+    def _find_union(self, content: str, hits: Set[int], union: re.Pattern, group_index: List[int]) -> None:
+        pos = 0
+        while len(hits) < len(self._owners):
+            match = union.search(content, pos)
+            if match is None:
+                break
+            index = group_index[match.lastindex - 1]
+            start = match.start()
+            hits.add(index)
+            for other in self._overlaps[index]:
+                if other not in hits and self._pattern(other).match(content, start):
+                    hits.add(other)
+            pos = start + 1
 
 
-def _connect() -> sqlite3.Connection:
-    return sqlite3.connect(DB_PATH, timeout=10)
+def _build_matchers(
+    buckets: Dict[ChannelKey, List[Tuple[int, str]]], keys: Optional[Iterable[ChannelKey]] = None
+) -> Dict[ChannelKey, KeywordMatcher]:
+    # Every channel with keywords of its own also tracks the guild-wide ones.
+    global_rows = buckets.get("GLOBAL", [])
+    return {
+        key: KeywordMatcher(global_rows if key == "GLOBAL" else global_rows + buckets[key])
+        for key in (buckets if keys is None else keys)
+        if key in buckets
+    }
 
 
-def add_keyword(user_id: int, keyword: str, channel_id: str, guild_id: int) -> bool:
-    conn = _connect()
-    try:
-        cur = conn.execute(
-            "INSERT OR IGNORE INTO keywords (user_id, keyword, channel_id, guild_id) VALUES (?, ?, ?, ?)",
-            (user_id, keyword, channel_id, guild_id),
-        )
-        conn.commit()
-        return cur.rowcount > 0
-    finally:
-        conn.close()
+def _build_all_matchers(
+    index: Dict[int, Dict[ChannelKey, List[Tuple[int, str]]]]
+) -> Dict[int, Dict[ChannelKey, KeywordMatcher]]:
+    return {guild_id: _build_matchers(buckets) for guild_id, buckets in index.items()}
 
 
-def keyword_exists(user_id: int, keyword: str, channel_id: str, guild_id: int) -> bool:
-    conn = _connect()
-    try:
-        cur = conn.execute(
-            "SELECT 1 FROM keywords WHERE user_id = ? AND keyword = ? AND channel_id = ? AND guild_id = ? LIMIT 1",
-            (user_id, keyword, channel_id, guild_id),
-        )
-        return cur.fetchone() is not None
-    finally:
-        conn.close()
+def init_db() -> None:
+    global _CONN
+    with _CONN_LOCK:
+        if _CONN is None:
+            _CONN = _open_db()
 
 
-def count_keywords(user_id: int, guild_id: int) -> int:
-    conn = _connect()
-    try:
-        cur = conn.execute(
-            "SELECT COUNT(*) FROM keywords WHERE user_id = ? AND guild_id = ?",
-            (user_id, guild_id),
+def _open_db() -> sqlite3.Connection:
+    db_dir = os.path.dirname(DB_PATH)
+    if db_dir:
+        os.makedirs(db_dir, exist_ok=True)
+    conn = sqlite3.connect(
+        DB_PATH,
+        timeout=10,
+        check_same_thread=False,
+        isolation_level=None,
+        cached_statements=256,
+    )
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-64000")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS keywords (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            keyword TEXT NOT NULL COLLATE NOCASE,
+            channel_id TEXT NOT NULL,
+            guild_id INTEGER NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_keywords_unique
+        ON keywords (user_id, keyword, channel_id, guild_id)
+        """
+    )
+    # Serves the per-user quota count and the ordered list-keywords query.
+    conn.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_keywords_user_guild
+        ON keywords (user_id, guild_id, keyword, channel_id)
+        """
+    )
+    # Per-guild reads are served from the in-memory index.
+    conn.execute("DROP INDEX IF EXISTS idx_keywords_guild")
+    conn.execute("ANALYZE")
+    return conn
+
+
+def _read_keyword_index() -> Dict[int, Dict[ChannelKey, List[Tuple[int, str]]]]:
+    index: Dict[int, Dict[ChannelKey, List[Tuple[int, str]]]] = {}
+    with _CONN_LOCK:
+        for guild_id, user_id, keyword, channel_id in _get_conn().execute(_SQL_ALL_KEYWORDS):
+            # Keywords repeat across users; intern them so the index holds one string
+            # object per distinct value.
+            buckets = index.setdefault(guild_id, {})
+            buckets.setdefault(_channel_key(channel_id), []).append((user_id, sys.intern(keyword)))
+    return index
+
+
+def _get_conn() -> sqlite3.Connection:
+    if _CONN is None:
+        init_db()
+    return _CONN
+
+
+def _insert_keyword(user_id: int, keyword: str, channel_id: str, guild_id: int) -> bool:
+    with _CONN_LOCK:
+        cur = _get_conn().execute(
+            _SQL_INSERT_UNDER_LIMIT,
+            (user_id, keyword, channel_id, guild_id, user_id, guild_id, KEYWORD_LIMIT),
         )
-        return int(cur.fetchone()[0])
-    finally:
-        conn.close()
+    return cur.rowcount > 0
 
 
-def list_keywords(user_id: int, guild_id: int) -> List[Tuple[str, str]]:
-    conn = _connect()
-    try:
-        cur = conn.execute(
-            "SELECT keyword, channel_id FROM keywords WHERE user_id = ? AND guild_id = ? ORDER BY keyword, channel_id",
+def _list_keywords(user_id: int, guild_id: int) -> List[Tuple[str, str]]:
+    with _CONN_LOCK:
+        cur = _get_conn().execute(
+            _SQL_LIST_KEYWORDS,
             (user_id, guild_id),
         )
-        return [(row[0], row[1]) for row in cur.fetchall()]
-    finally:
-        conn.close()
+        return cur.fetchall()
 
 
-def remove_keyword(user_id: int, guild_id: int, keyword: str) -> int:
-    conn = _connect()
-    try:
-        cur = conn.execute(
-            "DELETE FROM keywords WHERE user_id = ? AND guild_id = ? AND keyword = ?",
+def _remove_keyword(user_id: int, guild_id: int, keyword: str) -> int:
+    with _CONN_LOCK:
+        cur = _get_conn().execute(
+            _SQL_DELETE_KEYWORD,
             (user_id, guild_id, keyword),
         )
-        conn.commit()
-        return cur.rowcount
-    finally:
-        conn.close()
+    return cur.rowcount
 
 
-def fetch_keywords_for_guild(guild_id: int) -> List[Tuple[int, str, str]]:
-    conn = _connect()
-    try:
-        cur = conn.execute(
-            "SELECT user_id, keyword, channel_id FROM keywords WHERE guild_id = ?",
-            (guild_id,),
-        )
-        return [(row[0], row[1], row[2]) for row in cur.fetchall()]
-    finally:
-        conn.close()
+def _index_add_keyword(user_id: int, keyword: str, channel_id: str, guild_id: int) -> None:
+    key = _channel_key(channel_id)
+    buckets = _GUILD_KEYWORDS.setdefault(guild_id, {})
+    buckets.setdefault(key, []).append((user_id, sys.intern(keyword)))
 
 
-@bot.event
-async def on_ready() -> None:
-    setup_logging()
-    init_db()
-    guild_ids = [gid.strip() for gid in GUILD_IDS_RAW.split(",") if gid.strip()]
-    if guild_ids:
-        global_commands = list(tree.get_commands(guild=None))
-        tree.clear_commands(guild=None)
-        await tree.sync()
-        for guild_id in guild_ids:
-            try:
-                guild = discord.Object(id=int(guild_id))
-            except ValueError:
-                logger.warning("Invalid guild id for sync: %s", guild_id)
-                continue
-            for command in global_commands:
-                tree.add_command(command, guild=guild)
-            await tree.sync(guild=guild)
-            logger.info("Synced commands to guild=%s", guild_id)
+def _index_has_keyword(user_id: int, keyword: str, channel_id: str, guild_id: int) -> bool:
+    folded = keyword.translate(_NOCASE_TABLE)
+    rows = _GUILD_KEYWORDS.get(guild_id, {}).get(_channel_key(channel_id), [])
+    return any(row[0] == user_id and row[1].translate(_NOCASE_TABLE) == folded for row in rows)
+
+
+def _index_remove_keyword(user_id: int, guild_id: int, keyword: str) -> None:
+    buckets = _GUILD_KEYWORDS.get(guild_id, {})
+    folded = keyword.translate(_NOCASE_TABLE)
+    for key in list(buckets):
+        rows = [row for row in buckets[key] if row[0] != user_id or row[1].translate(_NOCASE_TABLE) != folded]
+        if rows:
+            buckets[key] = rows
+        else:
+            del buckets[key]
+
+
+async def _refresh_matchers(guild_id: int, key: Optional[ChannelKey] = None) -> None:
+    # Runs under _GUILD_LOCK, so the rows stay put while the worker thread builds.
+    # on_message keeps using the previous matchers until the swap.
+    buckets = _GUILD_KEYWORDS.get(guild_id, {})
+    if key is None or key == "GLOBAL":
+        matchers = await asyncio.to_thread(_build_matchers, buckets)
     else:
-        await tree.sync()
+        matchers = dict(_GUILD_MATCHERS.get(guild_id, {}))
+        matchers.update(await asyncio.to_thread(_build_matchers, buckets, [key]))
+    if matchers:
+        _GUILD_MATCHERS[guild_id] = matchers
+    else:
+        _GUILD_MATCHERS.pop(guild_id, None)
+
+
+# SQLite calls run on the default executor so they never block the gateway.
+async def try_add_keyword(user_id: int, keyword: str, channel_id: str, guild_id: int) -> AddKeywordResult:
+    async with _GUILD_LOCK:
+        if await asyncio.to_thread(_insert_keyword, user_id, keyword, channel_id, guild_id):
+            _index_add_keyword(user_id, keyword, channel_id, guild_id)
+            await _refresh_matchers(guild_id, _channel_key(channel_id))
+            return "added"
+        # Under the lock the index mirrors the table, so it can tell a duplicate
+        # from the quota limit without a second query.
+        return "duplicate" if _index_has_keyword(user_id, keyword, channel_id, guild_id) else "limit"
+
+
+async def load_keyword_index() -> None:
+    # The rows are read and the matchers built on worker threads but swapped in
+    # here, so on_message never sees a half-filled index.
+    async with _GUILD_LOCK:
+        index = await asyncio.to_thread(_read_keyword_index)
+        matchers = await asyncio.to_thread(_build_all_matchers, index)
+        _GUILD_KEYWORDS.clear()
+        _GUILD_KEYWORDS.update(index)
+        _GUILD_MATCHERS.clear()
+        _GUILD_MATCHERS.update(matchers)
+
+
+async def list_keywords(user_id: int, guild_id: int) -> List[Tuple[str, str]]:
+    return await asyncio.to_thread(_list_keywords, user_id, guild_id)
+
+
+async def remove_keyword(user_id: int, guild_id: int, keyword: str) -> int:
+    async with _GUILD_LOCK:
+        removed = await asyncio.to_thread(_remove_keyword, user_id, guild_id, keyword)
+        if removed > 0:
+            _index_remove_keyword(user_id, guild_id, keyword)
+            await _refresh_matchers(guild_id)
+    return removed
+
+
+async def setup_hook() -> None:
+    # login() awaits this before connecting to the gateway, so the keyword index
+    # is ready before the first message or command can arrive.
+    global _GUILD_LOCK, _NOTIFY_SEMAPHORE, _NOTIFY_QUEUE
+    _GUILD_LOCK = asyncio.Lock()
+    _NOTIFY_SEMAPHORE = asyncio.Semaphore(NOTIFY_CONCURRENCY)
+    _NOTIFY_QUEUE = asyncio.Queue(NOTIFY_QUEUE_SIZE)
+    setup_logging()
+    # Schema setup, ANALYZE and reading the rows stay off the event loop too.
+    await asyncio.to_thread(init_db)
+    await load_keyword_index()
+
+
+async def on_ready() -> None:
+    # on_ready fires again after every reconnect; workers and command sync run once.
+    # A failed attempt leaves the flag unset so the next on_ready retries it.
+    global _SYNCED
+    if not _SYNCED:
+        _start_notify_workers()
+        await _sync_commands()
+        _SYNCED = True
+    # Channels changed while disconnected send no channel events after a resume
+    # or re-identify, so the cached choices start over on every ready.
+    _CHANNEL_CHOICES.clear()
+    _CHANNEL_LABELS.clear()
     logger.info("Logged in as %s (ID: %s)", bot.user, bot.user.id)
 
 
+async def _sync_commands() -> None:
+    for guild_id in _GUILD_ID_ENTRIES:
+        if not guild_id.isdecimal():
+            logger.warning("Invalid guild id for sync: %s", guild_id)
+    if not GUILD_IDS:
+        await tree.sync()
+        return
+    # Commands move to every guild before the first await, so a retry after a
+    # failed sync still finds them there once the global list is empty.
+    guilds = [discord.Object(id=guild_id) for guild_id in GUILD_IDS]
+    global_commands = list(tree.get_commands(guild=None))
+    for guild in guilds:
+        for command in global_commands:
+            tree.add_command(command, guild=guild)
+    tree.clear_commands(guild=None)
+    await tree.sync()
+    for guild in guilds:
+        await tree.sync(guild=guild)
+        logger.info("Synced commands to guild=%s", guild.id)
+
+
 async def channel_autocomplete(
     interaction: discord.Interaction, current: str
 ) -> List[app_commands.Choice[str]]:
     if interaction.guild is None:
         return []
 
+    guild = interaction.guild
     query = current.lstrip("#").lower()
-    channels: List[discord.TextChannel] = []
-    for channel in interaction.guild.text_channels:
-        if not channel.permissions_for(interaction.user).view_channel:
+    choices: List[app_commands.Choice[str]] = []
+    for channel_id, name, choice in _get_channel_choices(guild):
+        if query and query not in name:
             continue
-        if query and query not in channel.name.lower():
+        key = (guild.id, interaction.user.id, channel_id)
+        visible = _VIEW_CACHE.get(key)
+        if visible is None:
+            channel = guild.get_channel(channel_id)
+            visible = channel is not None and channel.permissions_for(interaction.user).view_channel
+            _VIEW_CACHE.set(key, visible)
+        if not visible:
             continue
-        channels.append(channel)
+        choices.append(choice)
+        if len(choices) == 25:
+            break
+    return choices
+
+
+def _get_channel_choices(guild: discord.Guild) -> List[Tuple[int, str, app_commands.Choice[str]]]:
+    choices = _CHANNEL_CHOICES.get(guild.id)
+    if choices is None:
+        channels = sorted(guild.text_channels, key=lambda ch: ch.position)
+        choices = [
+            (channel.id, channel.name.lower(), app_commands.Choice(name=f"#{channel.name}", value=str(channel.id)))
+            for channel in channels
+        ]
+        _CHANNEL_CHOICES[guild.id] = choices
+    return choices
+
+
+def _get_channel_labels(guild: discord.Guild) -> Dict[str, str]:
+    labels = _CHANNEL_LABELS.get(guild.id)
+    if labels is None:
+        labels = {choice.value: choice.name for _, _, choice in _get_channel_choices(guild)}
+        _CHANNEL_LABELS[guild.id] = labels
+    return labels
+
+
+def _invalidate_channels(guild_id: int) -> None:
+    _CHANNEL_CHOICES.pop(guild_id, None)
+    _CHANNEL_LABELS.pop(guild_id, None)
+
+
+async def on_guild_channel_create(channel: discord.abc.GuildChannel) -> None:
+    _invalidate_channels(channel.guild.id)
+
+
+async def on_guild_channel_update(before: discord.abc.GuildChannel, after: discord.abc.GuildChannel) -> None:
+    _invalidate_channels(after.guild.id)
+
+
+async def on_guild_channel_delete(channel: discord.abc.GuildChannel) -> None:
+    _invalidate_channels(channel.guild.id)
+
+
+async def on_guild_available(guild: discord.Guild) -> None:
+    _invalidate_channels(guild.id)
+
+
+async def on_guild_join(guild: discord.Guild) -> None:
+    _invalidate_channels(guild.id)
 
-    channels.sort(key=lambda ch: ch.position)
-    return [
-        app_commands.Choice(name=f"#{channel.name}", value=str(channel.id))
-        for channel in channels[:25]
-    ]
+
+async def on_guild_remove(guild: discord.Guild) -> None:
+    _invalidate_channels(guild.id)
+
+
+async def _reply_keyword_limit(interaction: discord.Interaction) -> None:
+    await interaction.response.send_message(
+        f"키워드 한도에 도달했습니다(서버당 최대 {KEYWORD_LIMIT}개). 새로 추가하려면 기존 키워드를 삭제해 주세요.",
+        ephemeral=True,
+    )
+    logger.info(
+        "Keyword limit reached: user=%s guild=%s",
+        interaction.user.id,
+        interaction.guild.id,
+    )
 
 
-@tree.command(name="add-keyword-channel", description="특정 채널에 키워드를 추가합니다")
-@app_commands.describe(keyword="추적할 키워드", channel_id="키워드를 추적할 채널")
-@app_commands.autocomplete(channel_id=channel_autocomplete)
 async def add_keyword_channel(interaction: discord.Interaction, keyword: str, channel_id: str) -> None:
     if interaction.guild is None:
         await interaction.response.send_message("이 명령어는 서버에서만 사용할 수 있습니다.", ephemeral=True)
@@ -316,34 +894,8 @@ async def add_keyword_channel(interaction: discord.Interaction, keyword: str, ch
         await interaction.response.send_message("키워드는 비워둘 수 없습니다.", ephemeral=True)
         return
 
-    if keyword_exists(interaction.user.id, keyword, str(channel.id), interaction.guild.id):
-        await interaction.response.send_message(
-            f"`{keyword}` 키워드는 이미 {channel.mention}에서 추적 중입니다.",
-            ephemeral=True,
-        )
-        logger.info(
-            "Keyword already tracked (channel): user=%s guild=%s channel=%s keyword=%s",
-            interaction.user.id,
-            interaction.guild.id,
-            channel.id,
-            keyword,
-        )
-        return
-
-    if count_keywords(interaction.user.id, interaction.guild.id) >= 10:
-        await interaction.response.send_message(
-            "키워드 한도에 도달했습니다(서버당 최대 10개). 새로 추가하려면 기존 키워드를 삭제해 주세요.",
-            ephemeral=True,
-        )
-        logger.info(
-            "Keyword limit reached: user=%s guild=%s",
-            interaction.user.id,
-            interaction.guild.id,
-        )
-        return
-
-    added = add_keyword(interaction.user.id, keyword, str(channel.id), interaction.guild.id)
-    if added:
+    result = await try_add_keyword(interaction.user.id, keyword, str(channel.id), interaction.guild.id)
+    if result == "added":
         await interaction.response.send_message(
             f"{channel.mention}에 `{keyword}` 키워드를 추가했습니다.",
             ephemeral=True,
@@ -355,7 +907,7 @@ async def add_keyword_channel(interaction: discord.Interaction, keyword: str, ch
             channel.id,
             keyword,
         )
-    else:
+    elif result == "duplicate":
         await interaction.response.send_message(
             f"`{keyword}` 키워드는 이미 {channel.mention}에서 추적 중입니다.",
             ephemeral=True,
@@ -367,10 +919,10 @@ async def add_keyword_channel(interaction: discord.Interaction, keyword: str, ch
             channel.id,
             keyword,
         )
+    else:
+        await _reply_keyword_limit(interaction)
 
 
-@tree.command(name="add-keyword-server", description="이 서버의 접근 가능한 모든 채널에 키워드를 추가합니다")
-@app_commands.describe(keyword="서버 전체에서 추적할 키워드")
 async def add_keyword_server(interaction: discord.Interaction, keyword: str) -> None:
     if interaction.guild is None:
         await interaction.response.send_message("이 명령어는 서버에서만 사용할 수 있습니다.", ephemeral=True)
@@ -381,33 +933,8 @@ async def add_keyword_server(interaction: discord.Interaction, keyword: str) ->
         await interaction.response.send_message("키워드는 비워둘 수 없습니다.", ephemeral=True)
         return
 
-    if keyword_exists(interaction.user.id, keyword, "GLOBAL", interaction.guild.id):
-        await interaction.response.send_message(
-            f"`{keyword}` 키워드는 이미 서버 전체에서 추적 중입니다.",
-            ephemeral=True,
-        )
-        logger.info(
-            "Keyword already tracked (server): user=%s guild=%s keyword=%s",
-            interaction.user.id,
-            interaction.guild.id,
-            keyword,
-        )
-        return
-
-    if count_keywords(interaction.user.id, interaction.guild.id) >= 10:
-        await interaction.response.send_message(
-            "키워드 한도에 도달했습니다(서버당 최대 10개). 새로 추가하려면 기존 키워드를 삭제해 주세요.",
-            ephemeral=True,
-        )
-        logger.info(
-            "Keyword limit reached: user=%s guild=%s",
-            interaction.user.id,
-            interaction.guild.id,
-        )
-        return
-
-    added = add_keyword(interaction.user.id, keyword, "GLOBAL", interaction.guild.id)
-    if added:
+    result = await try_add_keyword(interaction.user.id, keyword, "GLOBAL", interaction.guild.id)
+    if result == "added":
         await interaction.response.send_message(
             f"이 서버의 접근 가능한 모든 채널에 `{keyword}` 키워드를 추가했습니다.",
             ephemeral=True,
@@ -418,7 +945,7 @@ async def add_keyword_server(interaction: discord.Interaction, keyword: str) ->
             interaction.guild.id,
             keyword,
         )
-    else:
+    elif result == "duplicate":
         await interaction.response.send_message(
             f"`{keyword}` 키워드는 이미 서버 전체에서 추적 중입니다.",
             ephemeral=True,
@@ -429,29 +956,34 @@ async def add_keyword_server(interaction: discord.Interaction, keyword: str) ->
             interaction.guild.id,
             keyword,
         )
+    else:
+        await _reply_keyword_limit(interaction)
 
 
-@tree.command(name="list-keywords", description="이 서버에서 추적 중인 키워드를 확인합니다")
 async def list_keywords_cmd(interaction: discord.Interaction) -> None:
     if interaction.guild is None:
         await interaction.response.send_message("이 명령어는 서버에서만 사용할 수 있습니다.", ephemeral=True)
         return
 
-    rows = list_keywords(interaction.user.id, interaction.guild.id)
+    rows = await list_keywords(interaction.user.id, interaction.guild.id)
     if not rows:
         await interaction.response.send_message("이 서버에서 추적 중인 키워드가 없습니다.", ephemeral=True)
         return
 
+    labels = _get_channel_labels(interaction.guild)
     lines: List[str] = []
     for keyword, channel_id in rows:
         if channel_id == "GLOBAL":
             location = "전체"
         else:
-            channel = interaction.guild.get_channel(int(channel_id))
-            if channel is None:
-                location = f"#알 수 없는 채널 ({channel_id})"
-            else:
-                location = f"#{channel.name}"
+            location = labels.get(channel_id)
+            if location is None:
+                # The label cache can lag behind guild state; get_channel() is current.
+                channel = interaction.guild.get_channel(int(channel_id))
+                if channel is None:
+                    location = f"#알 수 없는 채널 ({channel_id})"
+                else:
+                    location = f"#{channel.name}"
         lines.append(f"`{keyword}` → {location}")
 
     message = "내 키워드 목록:\n" + "\n".join(lines)
@@ -464,8 +996,6 @@ async def list_keywords_cmd(interaction: discord.Interaction) -> None:
     )
 
 
-@tree.command(name="remove-keyword", description="이 서버에서 키워드를 삭제합니다")
-@app_commands.describe(keyword="삭제할 키워드")
 async def remove_keyword_cmd(interaction: discord.Interaction, keyword: str) -> None:
     if interaction.guild is None:
         await interaction.response.send_message("이 명령어는 서버에서만 사용할 수 있습니다.", ephemeral=True)
@@ -476,7 +1006,7 @@ async def remove_keyword_cmd(interaction: discord.Interaction, keyword: str) ->
         await interaction.response.send_message("키워드는 비워둘 수 없습니다.", ephemeral=True)
         return
 
-    removed = remove_keyword(interaction.user.id, interaction.guild.id, keyword)
+    removed = await remove_keyword(interaction.user.id, interaction.guild.id, keyword)
     if removed > 0:
         await interaction.response.send_message(
             f"`{keyword}` 키워드를 이 서버에서 삭제했습니다 ({removed}개).",
@@ -506,83 +1036,75 @@ async def _get_member(guild: discord.Guild, user_id: int) -> Optional[discord.Me
     member = guild.get_member(user_id)
     if member is not None:
         return member
+    member = _MEMBER_CACHE.get((guild.id, user_id), _MISSING)
+    if member is not _MISSING:
+        return member
     try:
-        return await guild.fetch_member(user_id)
+        member = await guild.fetch_member(user_id)
     except discord.NotFound:
-        return None
+        member = None
     except discord.Forbidden:
         return None
+    _MEMBER_CACHE.set((guild.id, user_id), member)
+    return member
 
 
-@bot.event
-async def on_message(message: discord.Message) -> None:
-    if message.guild is None:
-        return
-    if not message.content:
-        return
-    # Only skip this bot's own messages; include other bot messages for keyword tracking.
-    if message.author.bot and bot.user is not None and message.author.id == bot.user.id:
-        return
+async def _prefetch_members(guild: discord.Guild, user_ids: Iterable[int]) -> None:
+    # One gateway request resolves up to 100 uncached members, so _get_member
+    # rarely needs its per-user HTTP fallback.
+    missing = [
+        user_id
+        for user_id in user_ids
+        if guild.get_member(user_id) is None and _MEMBER_CACHE.get((guild.id, user_id), _MISSING) is _MISSING
+    ]
+    for start in range(0, len(missing), 100):
+        batch = missing[start : start + 100]
+        try:
+            members = await guild.query_members(user_ids=batch, limit=100, cache=True)
+        except asyncio.TimeoutError:
+            logger.info("Member query timed out: guild=%s count=%s", guild.id, len(batch))
+            continue
+        found = {member.id for member in members}
+        for user_id in batch:
+            if user_id not in found:
+                _MEMBER_CACHE.set((guild.id, user_id), None)
+
+
+async def _get_user(user_id: int) -> Optional[discord.User]:
+    user = bot.get_user(user_id)
+    if user is not None:
+        return user
+    user = _USER_CACHE.get(user_id)
+    if user is not None:
+        return user
+    try:
+        user = await bot.fetch_user(user_id)
+    except discord.NotFound:
+        return None
+    except discord.Forbidden:
+        return None
+    _USER_CACHE.set(user_id, user)
+    return user
 
-    logger.info(
-        "Message seen: guild=%s channel=%s author=%s content=%s",
-        message.guild.id,
-        message.channel.id,
-        message.author.id,
-        _preview_message(message.content),
-    )
-    logger.debug("Processing message from %s: %s", message.author, _preview_message(message.content, 500))
 
-    rows = fetch_keywords_for_guild(message.guild.id)
-    if not rows:
-        logger.info("No keywords for guild=%s", message.guild.id)
-        logger.debug("No keywords registered for guild %s", message.guild.name)
-        return
+async def on_member_join(member: discord.Member) -> None:
+    _MEMBER_CACHE.pop((member.guild.id, member.id))
 
-    patterns: Dict[str, re.Pattern] = {}
-    matched: Dict[int, Set[str]] = {}
 
-    for user_id, keyword, channel_id in rows:
-        if message.author.id == user_id:
-            logger.info(
-                "Skip self match: user=%s keyword=%s",
-                user_id,
-                keyword,
-            )
-            continue
-        if channel_id != "GLOBAL" and str(message.channel.id) != channel_id:
-            continue
+async def on_member_update(before: discord.Member, after: discord.Member) -> None:
+    _MEMBER_CACHE.pop((after.guild.id, after.id))
 
-        pattern = patterns.get(keyword)
-        if pattern is None:
-            pattern = _compile_keyword_pattern(keyword)
-            patterns[keyword] = pattern
 
-        if not pattern.search(message.content):
-            logger.debug(
-                "Keyword '%s' found in DB but not matched in text.",
-                keyword,
-            )
-            continue
+async def on_member_remove(member: discord.Member) -> None:
+    _MEMBER_CACHE.pop((member.guild.id, member.id))
 
-        user_matches = matched.setdefault(user_id, set())
-        user_matches.add(keyword)
 
-    if not matched:
-        logger.info("No keyword matches: guild=%s channel=%s", message.guild.id, message.channel.id)
-        return
-
-    member_cache: Dict[int, Optional[discord.Member]] = {}
-    user_cache: Dict[int, Optional[discord.User]] = {}
-
-    for user_id, keywords in matched.items():
-        member = member_cache.get(user_id)
-        if member is None:
-            member = await _get_member(message.guild, user_id)
-            member_cache[user_id] = member
+async def _notify_user(message: discord.Message, user_id: int, keywords: Set[str], dm_text: str) -> None:
+    async with _NOTIFY_SEMAPHORE:
+        member = await _get_member(message.guild, user_id)
         if member is None:
             logger.info("Member not found: user=%s guild=%s", user_id, message.guild.id)
-            continue
+            return
 
         if not message.channel.permissions_for(member).view_channel:
             logger.info(
@@ -590,51 +1112,157 @@ async def on_message(message: discord.Message) -> None:
                 user_id,
                 message.channel.id,
             )
-            continue
-
-        user = user_cache.get(user_id)
-        if user is None:
-            user = bot.get_user(user_id)
-            if user is None:
-                try:
-                    user = await bot.fetch_user(user_id)
-                except discord.NotFound:
-                    user = None
-                except discord.Forbidden:
-                    user = None
-            user_cache[user_id] = user
+            return
 
+        user = await _get_user(user_id)
         if user is None:
             logger.info("User fetch failed: user=%s", user_id)
-            continue
-
-        for keyword in keywords:
-            dm_text = (
-                "## :mega: 키워드가 감지되었습니다\n"
-                f"채널: #{message.channel.name} ({message.jump_url})\n"
-                f"유저: {message.author.display_name}\n"
-                f"메시지: {message.content}\n"
-                "\n"
+            return
+
+        try:
+            await user.send(dm_text)
+        except discord.Forbidden:
+            logger.info("DM forbidden: user=%s", user_id)
+            return
+        except discord.HTTPException as exc:
+            logger.warning("DM failed: user=%s status=%s", user_id, exc.status)
+            return
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "DM sent: user=%s guild=%s channel=%s keywords=%s",
+                user_id,
+                message.guild.id,
+                message.channel.id,
+                ",".join(sorted(keywords)),
             )
-            try:
-                await user.send(dm_text)
-                logger.info(
-                    "DM sent: user=%s guild=%s channel=%s keyword=%s",
-                    user_id,
-                    message.guild.id,
-                    message.channel.id,
-                    keyword,
-                )
-            except discord.Forbidden:
-                logger.info("DM forbidden: user=%s", user_id)
-                break
+
+
+async def _notify_matches(message: discord.Message, matched: Dict[int, Set[str]]) -> None:
+    dm_text = (
+        "## :mega: 키워드가 감지되었습니다\n"
+        f"채널: #{message.channel.name} ({message.jump_url})\n"
+        f"유저: {message.author.display_name}\n"
+        f"메시지: {message.content}\n"
+        "\n"
+    )
+    await _prefetch_members(message.guild, matched)
+    results = await asyncio.gather(
+        *(_notify_user(message, user_id, keywords, dm_text) for user_id, keywords in matched.items()),
+        return_exceptions=True,
+    )
+    for user_id, result in zip(matched, results):
+        if isinstance(result, Exception):
+            logger.warning("Notify failed: user=%s error=%r", user_id, result)
+
+
+async def _notify_worker() -> None:
+    while True:
+        message, matched = await _NOTIFY_QUEUE.get()
+        try:
+            await _notify_matches(message, matched)
+        except Exception:
+            logger.exception("Notify worker failed: guild=%s channel=%s", message.guild.id, message.channel.id)
+        finally:
+            _NOTIFY_QUEUE.task_done()
+
+
+def _start_notify_workers() -> None:
+    if _NOTIFY_TASKS:
+        return
+    for _ in range(NOTIFY_WORKERS):
+        _NOTIFY_TASKS.append(asyncio.create_task(_notify_worker()))
+
+
+async def on_message(message: discord.Message) -> None:
+    if message.guild is None:
+        return
+    if not message.content:
+        return
+    # Only skip this bot's own messages; include other bot messages for keyword tracking.
+    if message.author.bot and bot.user is not None and message.author.id == bot.user.id:
+        return
+
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "Message seen: guild=%s channel=%s author=%s content=%s",
+            message.guild.id,
+            message.channel.id,
+            message.author.id,
+            _preview_message(message.content),
+        )
+
+    matchers = _GUILD_MATCHERS.get(message.guild.id)
+    if not matchers:
+        logger.info("No keywords for guild=%s", message.guild.id)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("No keywords registered for guild %s", message.guild.name)
+        return
+
+    channel_id = message.channel.id
+    # Channels without keywords of their own share the guild-wide matcher.
+    matcher = matchers.get(channel_id) or matchers.get("GLOBAL")
+    if matcher is None:
+        logger.info("No keywords for channel: guild=%s channel=%s", message.guild.id, channel_id)
+        return
+
+    matched = matcher.find(message.content, message.author.id)
+    if not matched:
+        logger.info("No keyword matches: guild=%s channel=%s", message.guild.id, message.channel.id)
+        return
+
+    try:
+        _NOTIFY_QUEUE.put_nowait((message, matched))
+    except asyncio.QueueFull:
+        logger.warning("Notify queue full, dropping: guild=%s channel=%s", message.guild.id, message.channel.id)
 
     if hasattr(bot, "process_commands"):
         await bot.process_commands(message)
 
 
+def _build_bot() -> None:
+    global discord, app_commands, bot, tree
+    import discord
+    from discord import app_commands
+
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.guilds = True
+    intents.members = True
+
+    bot = discord.Client(intents=intents)
+    tree = app_commands.CommandTree(bot)
+
+    # Client.login() awaits setup_hook before connecting to the gateway.
+    bot.event(setup_hook)
+    bot.event(on_ready)
+    bot.event(on_message)
+    bot.event(on_member_join)
+    bot.event(on_member_update)
+    bot.event(on_member_remove)
+    bot.event(on_guild_channel_create)
+    bot.event(on_guild_channel_update)
+    bot.event(on_guild_channel_delete)
+    bot.event(on_guild_available)
+    bot.event(on_guild_join)
+    bot.event(on_guild_remove)
+
+    tree.command(name="add-keyword-channel", description="특정 채널에 키워드를 추가합니다")(
+        app_commands.describe(keyword="추적할 키워드", channel_id="키워드를 추적할 채널")(
+            app_commands.autocomplete(channel_id=channel_autocomplete)(add_keyword_channel)
+        )
+    )
+    tree.command(name="add-keyword-server", description="이 서버의 접근 가능한 모든 채널에 키워드를 추가합니다")(
+        app_commands.describe(keyword="서버 전체에서 추적할 키워드")(add_keyword_server)
+    )
+    tree.command(name="list-keywords", description="이 서버에서 추적 중인 키워드를 확인합니다")(list_keywords_cmd)
+    tree.command(name="remove-keyword", description="이 서버에서 키워드를 삭제합니다")(
+        app_commands.describe(keyword="삭제할 키워드")(remove_keyword_cmd)
+    )
+
+
 if __name__ == "__main__":
     token = os.getenv("DISCORD_TOKEN")
     if not token:
         raise RuntimeError("DISCORD_TOKEN environment variable is required")
+    _build_bot()
     bot.run(token)
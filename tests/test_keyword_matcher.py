@@ -0,0 +1,96 @@
+import logging
+import random
+import unittest
+from unittest import mock
+
+import bot
+
+KEYWORDS = [
+    "foo", "Foo", "bar", "foo bar", "bar baz", "a", "a.b", "c++", "++", "-a-", ".net", "x_y", "1234",
+    "Python", "py", "é", "사과", "사과나무", "키워드", "갤럭시S", "#사과", "봇", "S",
+    "ſ", "K", "ı", "İ", "σ", "ς", "ι", "\u0345",
+]
+FILLERS = [
+    " ", "  ", ".", ",", "!", "\n", "_", "x", "é", "s", "S", "k", "i", "I", "Σ", "Ι", "\u1fbe", "ABC",
+    "이", "가", "에서", "나", "는", "를", "부터", "사",
+]
+CASES = [
+    ([(1, "python")], "I love PYTHON!"),
+    ([(1, "python")], "python이"),
+    ([(1, "키워드")], "키워드를 봐"),
+    ([(1, "키워드")], "키워드봇"),
+    ([(1, "키워드")], "키워드에서부터"),
+    ([(1, "foo bar"), (2, "bar baz"), (3, "foo")], "foo bar baz"),
+    ([(1, "c++"), (2, "++")], "i like c++ and ++"),
+    ([(1, "s"), (2, "st")], "ſt"),
+    ([(1, "i")], "ı İ"),
+    ([(1, "σ")], "ς Σ"),
+    ([(1, "k")], "K"),
+    ([(1, "\u212a")], "k"),
+    # lower() and IGNORECASE disagree on these, so the Aho-Corasick and str.find
+    # paths must fall back to the keyword's own pattern.
+    ([(1, "stop"), (2, "top")], "ſtop and STOP"),
+    ([(1, "İstanbul"), (2, "istanbul")], "İSTANBUL istanbul"),
+    ([(1, "python")], "İ python"),
+    ([(1, "키워드"), (2, "키워"), (3, "Python")], "İ 키워드를 PYTHON 키워드봇"),
+    ([(1, "iı")], "II ıi"),
+    ([(1, "ι")], "\u0345a"),
+    ([(1, "\u0345")], "iι"),
+    ([(1, "ι"), (2, "\u0345"), (3, "a")], "a ι\u0345 Ι"),
+]
+
+# Engine availability combinations the matcher has separate code paths for.
+ENGINES = {
+    "all": {"ahocorasick": bot.ahocorasick},
+    "regex prefilter only": {"ahocorasick": None},
+    "no prefilter engine": {"hyperscan": None, "re2": None},
+    "none": {"ahocorasick": None, "hyperscan": None, "re2": None},
+}
+
+
+def expected(rows, text, author_id):
+    matched = {}
+    for user_id, keyword in rows:
+        if user_id != author_id and bot._compile_keyword_pattern(keyword).search(text):
+            matched.setdefault(user_id, set()).add(keyword)
+    return matched
+
+
+class KeywordMatcherTest(unittest.TestCase):
+    """KeywordMatcher.find must agree with searching each keyword's own pattern."""
+
+    @classmethod
+    def setUpClass(cls):
+        logging.disable(logging.CRITICAL)
+
+    @classmethod
+    def tearDownClass(cls):
+        logging.disable(logging.NOTSET)
+
+    def assert_matches_patterns(self, rows, text, author_id=1):
+        for name, overrides in ENGINES.items():
+            with self.subTest(engines=name, rows=rows, text=text), mock.patch.multiple(bot, **overrides):
+                matcher = bot.KeywordMatcher(rows)
+                self.assertEqual(matcher.find(text, author_id), expected(rows, text, author_id))
+
+    def test_cases(self):
+        for rows, text in CASES:
+            self.assert_matches_patterns(rows, text, author_id=0)
+
+    def test_skips_author(self):
+        self.assert_matches_patterns([(1, "python"), (2, "python")], "python", author_id=1)
+
+    def test_random(self):
+        rng = random.Random(0)
+        for _ in range(300):
+            keywords = rng.sample(KEYWORDS, rng.randint(1, 8))
+            rows = [(rng.randint(1, 4), keyword) for keyword in keywords]
+            text = "".join(
+                rng.choice(KEYWORDS + FILLERS) if rng.random() < 0.5 else rng.choice(FILLERS)
+                for _ in range(rng.randint(0, 14))
+            )
+            self.assert_matches_patterns(rows, text)
+
+
+if __name__ == "__main__":
+    unittest.main()